@@ -1,4 +1,5 @@
-from gossip_spreading_util import ConstructERNetwork, ConstructGRNetwork, FastEstimateAsynchronousGossipTime, FastEstimateSynchronousGossipTime, EstimateSynchronousPrivateGossipTime, EstimateAsynchronousPrivateGossipTime
+from gossip_spreading_util import DEFAULT_END_CRITERIA, FindGiantComponent, LoadOrConstructERNetwork, RunGossipTasks, FastEstimateAsynchronousGossipTime
+import math
 import numpy as np
 
 failure_probability_list = np.arange(0, 0.91, 0.1)
@@ -6,15 +7,29 @@ number_of_nodes = 100000
 average_neighbors = 10
 monte_carlo_runs = 100
 graph_instances = 5
+random_seed = 42
 
-spreading_times = []
-total_time = 0
-for failure_probability in failure_probability_list:
-    print(failure_probability)
-    for _ in range(graph_instances):
-        neighbor_list = ConstructERNetwork(number_of_nodes, average_neighbors)
-        for _ in range(monte_carlo_runs):
-            source_node = np.random.choice(number_of_nodes)
-            total_time += FastEstimateAsynchronousGossipTime(source_node, number_of_nodes, neighbor_list, failure_probability)
-    spreading_times.append(total_time / graph_instances / monte_carlo_runs)
-    print(spreading_times)
\ No newline at end of file
+if __name__ == "__main__":
+    networks = [LoadOrConstructERNetwork(number_of_nodes, average_neighbors, seed) for seed in range(graph_instances)]
+    giant_components = [FindGiantComponent(network) for network in networks]
+    end_counts = [math.ceil(DEFAULT_END_CRITERIA * len(giant_component)) for giant_component in giant_components]
+    seed_sequence = np.random.SeedSequence(random_seed)
+    source_rng = np.random.default_rng(seed_sequence.spawn(1)[0])
+    tasks = []
+    for failure_probability in failure_probability_list:
+        for network_index, giant_component in enumerate(giant_components):
+            source_nodes = source_rng.choice(giant_component, monte_carlo_runs).tolist()
+            for source_node, seed in zip(source_nodes, seed_sequence.spawn(monte_carlo_runs)):
+                tasks.append((network_index, failure_probability, source_node, seed))
+    estimate_times = RunGossipTasks(FastEstimateAsynchronousGossipTime, networks, number_of_nodes, end_counts, tasks)
+    runs_per_probability = graph_instances * monte_carlo_runs
+    spreading_times = []
+    for i, failure_probability in enumerate(failure_probability_list):
+        print(failure_probability)
+        # A source in the giant component always reaches the end count, runs that died out (-1) are skipped
+        # and reported instead of biasing the average.
+        finished_times = [t for t in estimate_times[i * runs_per_probability:(i + 1) * runs_per_probability] if t >= 0]
+        if len(finished_times) < runs_per_probability:
+            print("%d runs died out before reaching the end count" % (runs_per_probability - len(finished_times)))
+        spreading_times.append(math.fsum(finished_times) / len(finished_times))
+        print(spreading_times)
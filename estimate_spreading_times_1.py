@@ -1,16 +1,32 @@
-from gossip_spreading_util import ConstructERNetwork, ConstructGRNetwork, FastEstimateAsynchronousGossipTime, FastEstimateSynchronousGossipTime, EstimateSynchronousPrivateGossipTime, EstimateAsynchronousPrivateGossipTime
+from gossip_spreading_util import DEFAULT_END_CRITERIA, FindGiantComponent, LoadOrConstructERNetwork, RunGossipTasks, FastEstimateSynchronousGossipTime
+import math
 import numpy as np
 
 number_of_nodes = 100000
 failure_probabilities = [0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9]
-for failure_probability in failure_probabilities:
-    print(failure_probability)
+random_seed = 42
+
+if __name__ == "__main__":
     network_instances = 5
     monte_runs = 100
-    total_estimate_time = 0
-    for _ in range(network_instances):
-        neighbor_list = ConstructERNetwork(number_of_nodes, 10)
-        for run in range(monte_runs):
-            source_node = int(number_of_nodes * np.random.rand())
-            total_estimate_time += FastEstimateSynchronousGossipTime(source_node, number_of_nodes, neighbor_list, failure_probability)
-    print(total_estimate_time / monte_runs / network_instances)
\ No newline at end of file
+    networks = [LoadOrConstructERNetwork(number_of_nodes, 10, seed) for seed in range(network_instances)]
+    giant_components = [FindGiantComponent(network) for network in networks]
+    end_counts = [math.ceil(DEFAULT_END_CRITERIA * len(giant_component)) for giant_component in giant_components]
+    seed_sequence = np.random.SeedSequence(random_seed)
+    source_rng = np.random.default_rng(seed_sequence.spawn(1)[0])
+    tasks = []
+    for failure_probability in failure_probabilities:
+        for network_index, giant_component in enumerate(giant_components):
+            source_nodes = source_rng.choice(giant_component, monte_runs).tolist()
+            for source_node, seed in zip(source_nodes, seed_sequence.spawn(monte_runs)):
+                tasks.append((network_index, failure_probability, source_node, seed))
+    estimate_times = RunGossipTasks(FastEstimateSynchronousGossipTime, networks, number_of_nodes, end_counts, tasks)
+    runs_per_probability = network_instances * monte_runs
+    for i, failure_probability in enumerate(failure_probabilities):
+        print(failure_probability)
+        # A source in the giant component always reaches the end count, runs that died out (-1) are skipped
+        # and reported instead of biasing the average.
+        finished_times = [t for t in estimate_times[i * runs_per_probability:(i + 1) * runs_per_probability] if t >= 0]
+        if len(finished_times) < runs_per_probability:
+            print("%d runs died out before reaching the end count" % (runs_per_probability - len(finished_times)))
+        print(sum(finished_times) / len(finished_times))
@@ -1,10 +1,54 @@
 import math
-import networkx as nx
 import numpy as np
 import heapq
+import os
+import tempfile
 import time
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+from numba import njit, typeof, types
 from scipy import spatial
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
 
+# The random generator shared by all simulations, the compiled kernels draw from it as well.
+_rng = np.random.default_rng()
+
+# The kernels are compiled eagerly for these argument types when the module is imported. Together with the
+# on disk cache, later runs load the compiled code instead of compiling it and forked pool workers inherit it.
+CSR_ARRAY_TYPE = types.int32[::1]
+RANDOM_GENERATOR_TYPE = typeof(_rng)
+# The fraction of nodes that are infected at the end of the spreading process if it is not specified.
+DEFAULT_END_CRITERIA = 0.9
+# The version of the Erdos Renyi sampler, which is part of the cache file names so that networks sampled by an older
+# sampler are not reused for the same seed.
+ER_NETWORK_VERSION = 2
+# The number of tasks that a pool worker takes at a time, the tasks are sorted by failure probability and the
+# later ones are several times slower, so small chunks are needed to balance them over the workers.
+POOL_CHUNK_SIZE = 16
+# The initial capacity of the event heap in the compiled asynchronous gossip, which doubles when it is full.
+INITIAL_HEAP_CAPACITY = 1024
+FAST_GOSSIP_KERNEL_ARGUMENT_TYPES = (CSR_ARRAY_TYPE, CSR_ARRAY_TYPE, types.int64, types.float64, types.int64, RANDOM_GENERATOR_TYPE)
+
+
+def EdgesToCSR(number_of_nodes, sources, targets):
+    """Builds the CSR arrays of an undirected network from its edge list.
+
+    Args:
+        number_of_nodes: Number of nodes in the network.
+        sources: The first endpoints of the edges, every undirected edge is listed once.
+        targets: The second endpoints of the edges.
+
+    Returns:
+        The (indptr, indices) CSR arrays that store all neighbors of all nodes in the network.
+    """
+    from_nodes = np.concatenate((sources, targets))
+    to_nodes = np.concatenate((targets, sources))
+    order = np.argsort(from_nodes, kind="stable")
+    indptr = np.zeros(number_of_nodes + 1, np.int32)
+    np.cumsum(np.bincount(from_nodes, minlength=number_of_nodes), out=indptr[1:])
+    indices = to_nodes[order].astype(np.int32)
+    return indptr, indices
 
 def ConstructGRNetwork(number_of_nodes, average_neighbors):
     """Constructs a Geometric Random Network with the given number of nodes and average number of neighbors using K-D Tree.
@@ -14,30 +58,122 @@ def ConstructGRNetwork(number_of_nodes, average_neighbors):
         average_neighbors: Average number of neighbors of the generated network.
 
     Returns:
-        The neighbor list stores all neighbors of all nodes in the network.
+        The (indptr, indices) CSR arrays that store all neighbors of all nodes in the network.
     """
-    positions = np.random.rand(number_of_nodes, 2)
+    positions = _rng.random((number_of_nodes, 2))
     kdtree = spatial.KDTree(positions)
     r = np.sqrt(average_neighbors / number_of_nodes / math.pi)
-    pairs = list(kdtree.query_pairs(r))
-    G = nx.Graph()
-    G.add_nodes_from(range(number_of_nodes))
-    G.add_edges_from(pairs)
+    pairs = kdtree.query_pairs(r, output_type="ndarray")
+    return EdgesToCSR(number_of_nodes, pairs[:, 0], pairs[:, 1])
 
-    return [list(G.neighbors(i)) for i in range(number_of_nodes)]
-
-def ConstructERNetwork(number_of_nodes, average_neighbors):
+def ConstructERNetwork(number_of_nodes, average_neighbors, seed=None):
     """Constructs a Erdos Renyi Network with the given number of nodes and average number of neighbors.
 
     Args:
         number_of_nodes: Number of nodes in the network.
         average_neighbors: Average number of neighbors of the generated network.
+        seed: The seed of the random network, a random network is generated if it is None.
+
+    Returns:
+        The (indptr, indices) CSR arrays that store all neighbors of all nodes in the network.
+    """
+    rng = np.random.default_rng(seed)
+    number_of_edges = rng.binomial(number_of_nodes * (number_of_nodes - 1) // 2, average_neighbors / number_of_nodes)
+    # Each undirected edge (u, v) with u < v is encoded as u * number_of_nodes + v, uniform pairs are
+    # drawn until number_of_edges distinct edges are collected, which gives a uniform set of edges.
+    edge_keys = np.empty(0, np.int64)
+    while edge_keys.size < number_of_edges:
+        missing_edges = number_of_edges - edge_keys.size
+        sources = rng.integers(0, number_of_nodes, missing_edges, dtype=np.int64)
+        targets = rng.integers(0, number_of_nodes, missing_edges, dtype=np.int64)
+        not_self_loop = sources != targets
+        sources, targets = sources[not_self_loop], targets[not_self_loop]
+        new_edge_keys = np.minimum(sources, targets) * number_of_nodes + np.maximum(sources, targets)
+        edge_keys = np.sort(np.concatenate((edge_keys, new_edge_keys)))
+        edge_keys = edge_keys[np.concatenate(([True], edge_keys[1:] != edge_keys[:-1]))]
+    return EdgesToCSR(number_of_nodes, edge_keys // number_of_nodes, edge_keys % number_of_nodes)
+
+def LoadOrConstructERNetwork(number_of_nodes, average_neighbors, seed, cache_directory="network_cache"):
+    """Loads the Erdos Renyi Network from the disk cache, the network is constructed and cached if it is missing.
+
+    The network is written to a temporary file that is moved into place, so concurrent runs never load a partial file.
+
+    Args:
+        number_of_nodes: Number of nodes in the network.
+        average_neighbors: Average number of neighbors of the generated network.
+        seed: The seed of the random network, which identifies the network in the cache together with the sizes.
+        cache_directory: The directory that stores the cached networks.
+
+    Returns:
+        The (indptr, indices) CSR arrays that store all neighbors of all nodes in the network.
+    """
+    path = os.path.join(cache_directory, "er_v%d_%d_%g_%d.npz" % (ER_NETWORK_VERSION, number_of_nodes,
+                                                                  average_neighbors, seed))
+    if os.path.exists(path):
+        with np.load(path) as cached_network:
+            return cached_network["indptr"], cached_network["indices"]
+    indptr, indices = ConstructERNetwork(number_of_nodes, average_neighbors, seed)
+    os.makedirs(cache_directory, exist_ok=True)
+    file_descriptor, temporary_path = tempfile.mkstemp(suffix=".npz", dir=cache_directory)
+    try:
+        with os.fdopen(file_descriptor, "wb") as temporary_file:
+            np.savez(temporary_file, indptr=indptr, indices=indices)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+    return indptr, indices
+
+def CreateSharedNetwork(network):
+    """Copies the CSR arrays of the network into shared memory, so that worker processes can use them without pickling.
+
+    Args:
+        network: The (indptr, indices) CSR arrays that store the neighbors of all nodes.
 
     Returns:
-        The neighbor list stores all neighbors of all nodes in the network.
+        The shared memory blocks, which the caller must close and unlink once the workers are done, and the
+        description of the network that the workers pass to AttachSharedNetwork.
     """
-    G = nx.fast_gnp_random_graph(number_of_nodes, average_neighbors / number_of_nodes)
-    return [list(G.neighbors(i)) for i in range(number_of_nodes)]
+    shared_memories = []
+    network_description = []
+    for array in network:
+        shared_memory = SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, array.dtype, buffer=shared_memory.buf)[:] = array
+        shared_memories.append(shared_memory)
+        network_description.append((shared_memory.name, array.shape, array.dtype.str))
+    return shared_memories, tuple(network_description)
+
+def AttachSharedNetwork(network_description):
+    """Attaches to the CSR arrays of a network created by CreateSharedNetwork in another process.
+
+    Args:
+        network_description: The description of the network returned by CreateSharedNetwork.
+
+    Returns:
+        The shared memory blocks, which must be kept alive while the network is used, and the (indptr, indices)
+        CSR arrays backed by them.
+    """
+    shared_memories = [SharedMemory(name=name) for name, _, _ in network_description]
+    network = tuple(np.ndarray(shape, dtype, buffer=shared_memory.buf)
+                    for shared_memory, (_, shape, dtype) in zip(shared_memories, network_description))
+    return shared_memories, network
+
+def FindGiantComponent(network):
+    """Finds the nodes in the largest connected component of the network.
+
+    Nodes outside of the giant component can never be reached from a source inside of it, so the end of
+    the spreading process should be measured against the size of the giant component.
+    Args:
+        network: The (indptr, indices) CSR arrays that store the neighbors of all nodes.
+
+    Returns:
+        The nodes in the giant component.
+    """
+    indptr, indices = network
+    number_of_nodes = len(indptr) - 1
+    adjacency_matrix = csr_matrix((np.ones(len(indices), np.int8), indices, indptr), shape=(number_of_nodes, number_of_nodes))
+    _, labels = connected_components(adjacency_matrix, directed=False)
+    return np.flatnonzero(labels == np.bincount(labels).argmax())
 
 def PoissonSample(rate):
     """Generates a interarrival time between two consecutive events in a Poisson process with the input rate.
@@ -48,37 +184,75 @@ def PoissonSample(rate):
     Returns:
         A interarraival time.
     """
-    return -np.log(np.random.rand()) / rate
+    return _rng.standard_exponential() / rate
+
+class RandomNumberPool:
+    """Serves random numbers one at a time from chunks that are generated in bulk.
+
+    This amortizes the NumPy call overhead of drawing a single scalar per event in the Python estimators.
+    Args:
+        sampler: The function that draws a chunk of random numbers given the chunk size, like Generator.random.
+        chunk_size: The number of random numbers generated per refill.
+    """
+
+    def __init__(self, sampler, chunk_size=8192):
+        self.sampler = sampler
+        self.chunk_size = chunk_size
+        self.Refill()
 
-def EstimateSynchronousGossipTime(source_node, number_of_nodes, neighbor_list, failure_probability, end_criteria=0.9):
+    def Refill(self):
+        """Replaces the exhausted chunk with newly generated random numbers."""
+        self.buffer = self.sampler(self.chunk_size).tolist()
+        self.position = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.position == self.chunk_size:
+            self.Refill()
+        value = self.buffer[self.position]
+        self.position += 1
+        return value
+
+def EstimateSynchronousGossipTime(source_node, number_of_nodes, network, failure_probability,
+                                  end_criteria=DEFAULT_END_CRITERIA, rng=None):
     """Estimates the spreading time for the synchronous gossip.
 
     Args:
         source_node: The source of the spreading process.
         number_of_nodes: Number of nodes in the network.
-        neighbor_list: The list that stores the neighbors of all nodes.
+        network: The (indptr, indices) CSR arrays that store the neighbors of all nodes.
         failure_probability: The probability that an infected node fails to push the information to its chosen.
         end_criteria: The criteria that marks the end of the spreading process, it should be the format of a fraction,
             which represents the fraction of nodes that are infected in the end.
+        rng: The numpy random generator that the simulation draws from, the shared generator is used if it is None.
 
     Returns:
         The estimated the spreading time for the synchronous gossip.
     """
+    indptr, indices = network
+    degrees = np.diff(indptr)
+    if rng is None:
+        rng = _rng
     t = 0
-    infected_node_set = set()
-    infected_node_set.add(source_node)
+    infected = np.zeros(number_of_nodes, np.uint8)
+    infected[source_node] = 1
+    infected_nodes = np.array([source_node], np.int32)
+    end_count = end_criteria * number_of_nodes
     while True:
-        newly_infected_node_set = set()
-        for active_node in infected_node_set:
-            if np.random.rand() >= failure_probability:
-                chosen_node = np.random.choice(neighbor_list[active_node])
-                newly_infected_node_set.add(chosen_node)
-        infected_node_set = infected_node_set.union(newly_infected_node_set)
+        pushing_nodes = infected_nodes[rng.random(infected_nodes.size) >= failure_probability]
+        chosen_nodes = indices[indptr[pushing_nodes] + rng.integers(0, degrees[pushing_nodes])]
+        newly_infected_nodes = np.unique(chosen_nodes[infected[chosen_nodes] == 0])
+        infected[newly_infected_nodes] = 1
+        infected_nodes = np.concatenate((infected_nodes, newly_infected_nodes))
         t += 1
-        if len(infected_node_set) >= end_criteria * len(neighbor_list):
+        if infected_nodes.size >= end_count:
             return t
 
-def FastEstimateSynchronousGossipTime(source_node, number_of_nodes, neighbor_list, failure_probability, end_criteria=0.9):
+def FastEstimateSynchronousGossipTime(source_node, number_of_nodes, network, failure_probability,
+                                      end_criteria=DEFAULT_END_CRITERIA,
+                                      end_count=None, rng=None):
     """Estimates the spreading time for the synchronous gossip fast by filtering out useless nodes.
 
     This is only useful for estimate the spreading time. Use the above exact synchronous gossip process
@@ -86,35 +260,99 @@ def FastEstimateSynchronousGossipTime(source_node, number_of_nodes, neighbor_lis
     Args:
         source_node: The source of the spreading process.
         number_of_nodes: Number of nodes in the network.
-        neighbor_list: The list that stores the neighbors of all nodes.
+        network: The (indptr, indices) CSR arrays that store the neighbors of all nodes.
         failure_probability: The probability that an infected node fails to push the information to its chosen.
         end_criteria: The criteria that marks the end of the spreading process, it should be the format of a fraction,
             which represents the fraction of nodes that are infected in the end.
+        end_count: The number of infected nodes that marks the end of the spreading process, which overrides
+            end_criteria if it is given, e.g. the end_criteria fraction of the giant component.
+        rng: The numpy random generator that the simulation draws from, the shared generator is used if it is None.
+            It must be a numpy Generator, the legacy RandomState is not supported by the compiled kernel.
 
     Returns:
-        The estimated the spreading time for the synchronous gossip.
+        The estimated the spreading time for the synchronous gossip, or -1 if the spreading dies out before end_count
+            nodes are infected.
+    """
+    # The kernel is compiled for contiguous int32 CSR arrays and integer counts only, so other networks
+    # (e.g. int64 arrays from scipy) are converted here, which is free for the networks built above.
+    indptr, indices = network
+    indptr = np.ascontiguousarray(indptr, np.int32)
+    indices = np.ascontiguousarray(indices, np.int32)
+    if end_count is None:
+        end_count = end_criteria * number_of_nodes
+    end_count = math.ceil(end_count)
+    if rng is None:
+        rng = _rng
+    return FastSynchronousGossipKernel(indptr, indices, int(source_node), float(failure_probability), end_count, rng)
+
+@njit(cache=True)
+def InfectNode(indptr, indices, infected, uninfected_neighbor_counts, node):
+    """Marks the node as infected in the compiled kernels and updates the counters of its neighbors.
+
+    Args:
+        indptr: The CSR row pointers of the network.
+        indices: The CSR neighbor indices of the network.
+        infected: The bitmap of the infected nodes.
+        uninfected_neighbor_counts: The number of uninfected neighbors of every node.
+        node: The newly infected node.
+    """
+    infected[node] = 1
+    for j in range(indptr[node], indptr[node + 1]):
+        uninfected_neighbor_counts[indices[j]] -= 1
+
+@njit(types.int64(*FAST_GOSSIP_KERNEL_ARGUMENT_TYPES), cache=True)
+def FastSynchronousGossipKernel(indptr, indices, source_node, failure_probability, end_count, rng):
+    """Runs the synchronous gossip with useless node filtering as a compiled kernel.
+
+    Infected nodes are tracked in a bitmap and the useful nodes in a worklist, the worklist for the
+    next round is written into a second buffer and the two buffers are swapped after each round.
+    A node is useless once its counter of uninfected neighbors reaches zero. The usefulness test, the push
+    and the choice of the neighbor are fused into a single pass over the worklist, and the random numbers
+    are only drawn for the useful nodes.
+    Args:
+        indptr: The CSR row pointers of the network.
+        indices: The CSR neighbor indices of the network.
+        source_node: The source of the spreading process.
+        failure_probability: The probability that an infected node fails to push the information to its chosen.
+        end_count: The number of infected nodes that marks the end of the spreading process.
+        rng: The numpy random generator that the kernel draws from.
+
+    Returns:
+        The number of rounds until at least end_count nodes are infected, or -1 if no useful node is left before.
     """
+    number_of_nodes = indptr.shape[0] - 1
+    infected = np.zeros(number_of_nodes, np.uint8)
+    uninfected_neighbor_counts = indptr[1:] - indptr[:-1]
+    useful = np.empty(number_of_nodes, np.int32)
+    next_useful = np.empty(number_of_nodes, np.int32)
+    InfectNode(indptr, indices, infected, uninfected_neighbor_counts, source_node)
+    infected_count = 1
+    useful[0] = source_node
+    useful_count = 1
     t = 0
-    infected_node_set = set()
-    useful_node_set = set()
-    infected_node_set.add(source_node)
-    useful_node_set.add(source_node)
     while True:
-        useless_node_set = set()
-        newly_infected_node_set = set()
-        for active_node in useful_node_set:
-            if set(neighbor_list[active_node]).issubset(infected_node_set):
-                useless_node_set.add(active_node)
+        next_useful_count = 0
+        for i in range(useful_count):
+            active_node = useful[i]
+            if uninfected_neighbor_counts[active_node] == 0:
                 continue
-            if np.random.rand() >= failure_probability:
-                chosen_node = np.random.choice(neighbor_list[active_node])
-                infected_node_set.add(chosen_node)
-                newly_infected_node_set.add(chosen_node)
-        useful_node_set = useful_node_set.union(newly_infected_node_set)
-        useful_node_set = useful_node_set.difference(useless_node_set)
+            next_useful[next_useful_count] = active_node
+            next_useful_count += 1
+            if rng.random() >= failure_probability:
+                start = indptr[active_node]
+                chosen_node = indices[start + rng.integers(0, indptr[active_node + 1] - start)]
+                if infected[chosen_node] == 0:
+                    InfectNode(indptr, indices, infected, uninfected_neighbor_counts, chosen_node)
+                    infected_count += 1
+                    next_useful[next_useful_count] = chosen_node
+                    next_useful_count += 1
+        useful, next_useful = next_useful, useful
+        useful_count = next_useful_count
         t += 1
-        if len(infected_node_set) >= end_criteria * len(neighbor_list):
+        if infected_count >= end_count:
             return t
+        if useful_count == 0:
+            return -1
 
 def PushAsynchronousEvent(event_heap, time, node):
     """Pushes the event into the event heap in the asynchronous gossip.
@@ -126,40 +364,134 @@ def PushAsynchronousEvent(event_heap, time, node):
     """
     heapq.heappush(event_heap, (time, node))
 
-def EstimateAsynchronousGossipTime(source_node, number_of_nodes, neighbor_list, failure_probability, end_criteria=0.9):
+def EstimateAsynchronousGossipTime(source_node, number_of_nodes, network, failure_probability,
+                                   end_criteria=DEFAULT_END_CRITERIA, rng=None):
     """Estimates the spreading time for the asynchronous gossip.
 
     Args:
         source_node: The source of the spreading process.
         number_of_nodes: Number of nodes in the network.
-        neighbor_list: The list that stores the neighbors of all nodes.
+        network: The (indptr, indices) CSR arrays that store the neighbors of all nodes.
         failure_probability: The probability that an infected node fails to push the information to its chosen.
         end_criteria: The criteria that marks the end of the spreading process, it should be the format of a fraction,
             which represents the fraction of nodes that are infected in the end.
+        rng: The numpy random generator that the simulation draws from, the shared generator is used if it is None.
 
     Returns:
         The estimated the spreading time for the asynchronous gossip.
     """
+    indptr, indices = network
+    degrees = np.diff(indptr)
+    if rng is None:
+        rng = _rng
+    exponential_pool = RandomNumberPool(rng.standard_exponential)
+    uniform_pool = RandomNumberPool(rng.random)
     t = 0
-    infected_node_set = set()
-    infected_node_set.add(source_node)
+    infected = bytearray(number_of_nodes)
+    infected[source_node] = 1
+    infected_count = 1
+    end_count = end_criteria * number_of_nodes
     event_heap = []
     heapq.heapify(event_heap)
-    PushAsynchronousEvent(event_heap, t + PoissonSample(1.0), source_node)
+    PushAsynchronousEvent(event_heap, t + next(exponential_pool), source_node)
     while True:
         current_time, active_node = heapq.heappop(event_heap)
         uninf_node_chosen = False
-        if np.random.rand() >= failure_probability:
-            chosen_node = np.random.choice(neighbor_list[active_node])
-            uninf_node_chosen = (chosen_node not in infected_node_set)
-            infected_node_set.add(chosen_node)
-        if len(infected_node_set) >= end_criteria * len(neighbor_list):
+        if next(uniform_pool) >= failure_probability:
+            if degrees[active_node] == 0:
+                raise ValueError("Node %d has no neighbor to push the information to." % active_node)
+            chosen_node = int(indices[indptr[active_node] + int(next(uniform_pool) * degrees[active_node])])
+            uninf_node_chosen = not infected[chosen_node]
+            if uninf_node_chosen:
+                infected[chosen_node] = 1
+                infected_count += 1
+        if infected_count >= end_count:
             return current_time
-        PushAsynchronousEvent(event_heap, current_time + PoissonSample(1.0), active_node)
+        PushAsynchronousEvent(event_heap, current_time + next(exponential_pool), active_node)
         if uninf_node_chosen:
-            PushAsynchronousEvent(event_heap, current_time + PoissonSample(1.0), chosen_node)
+            PushAsynchronousEvent(event_heap, current_time + next(exponential_pool), chosen_node)
+
+@njit(cache=True)
+def HeapPush(times, nodes, size, time, node):
+    """Pushes the event into the array backed event heap used by the compiled asynchronous gossip.
+
+    Args:
+        times: The event times of the heap, ordered as a binary min heap.
+        nodes: The event nodes of the heap, stored in lockstep with times.
+        size: The number of events currently in the heap.
+        time: The time for the new event to be pushed.
+        node: The node for the new event to be pushed.
+
+    Returns:
+        The number of events in the heap after the push.
+    """
+    i = size
+    while i > 0:
+        parent = (i - 1) >> 1
+        if times[parent] <= time:
+            break
+        times[i] = times[parent]
+        nodes[i] = nodes[parent]
+        i = parent
+    times[i] = time
+    nodes[i] = node
+    return size + 1
+
+@njit(cache=True)
+def HeapPop(times, nodes, size):
+    """Pops the earliest event from the array backed event heap used by the compiled asynchronous gossip.
+
+    Args:
+        times: The event times of the heap, ordered as a binary min heap.
+        nodes: The event nodes of the heap, stored in lockstep with times.
+        size: The number of events currently in the heap, it must be positive.
 
-def FastEstimateAsynchronousGossipTime(source_node, number_of_nodes, neighbor_list, failure_probability, end_criteria=0.9):
+    Returns:
+        The time and node of the popped event, and the number of events in the heap after the pop.
+    """
+    top_time = times[0]
+    top_node = nodes[0]
+    size -= 1
+    last_time = times[size]
+    last_node = nodes[size]
+    i = 0
+    while True:
+        child = 2 * i + 1
+        if child >= size:
+            break
+        if child + 1 < size and times[child + 1] < times[child]:
+            child += 1
+        if last_time <= times[child]:
+            break
+        times[i] = times[child]
+        nodes[i] = nodes[child]
+        i = child
+    times[i] = last_time
+    nodes[i] = last_node
+    return top_time, top_node, size
+
+@njit(cache=True)
+def GrowHeap(times, nodes, max_capacity):
+    """Doubles the capacity of the array backed event heap used by the compiled asynchronous gossip.
+
+    Args:
+        times: The event times of the full heap.
+        nodes: The event nodes of the full heap.
+        max_capacity: The capacity that the heap never needs to exceed.
+
+    Returns:
+        The times and nodes arrays of the grown heap, holding the same events.
+    """
+    capacity = min(2 * times.shape[0], max_capacity)
+    new_times = np.empty(capacity, times.dtype)
+    new_nodes = np.empty(capacity, nodes.dtype)
+    new_times[:times.shape[0]] = times
+    new_nodes[:nodes.shape[0]] = nodes
+    return new_times, new_nodes
+
+def FastEstimateAsynchronousGossipTime(source_node, number_of_nodes, network, failure_probability,
+                                       end_criteria=DEFAULT_END_CRITERIA,
+                                       end_count=None, rng=None):
     """Estimates the spreading time for the asynchronous gossip fast by filtering out unuseful events.
 
     This is only useful for estimate the spreading time. Use the above exact asynchronous gossip process
@@ -167,39 +499,150 @@ def FastEstimateAsynchronousGossipTime(source_node, number_of_nodes, neighbor_li
     Args:
         source_node: The source of the spreading process.
         number_of_nodes: Number of nodes in the network.
-        neighbor_list: The list that stores the neighbors of all nodes.
+        network: The (indptr, indices) CSR arrays that store the neighbors of all nodes.
         failure_probability: The probability that an infected node fails to push the information to its chosen.
         end_criteria: The criteria that marks the end of the spreading process, it should be the format of a fraction,
             which represents the fraction of nodes that are infected in the end.
+        end_count: The number of infected nodes that marks the end of the spreading process, which overrides
+            end_criteria if it is given, e.g. the end_criteria fraction of the giant component.
+        rng: The numpy random generator that the simulation draws from, the shared generator is used if it is None.
+            It must be a numpy Generator, the legacy RandomState is not supported by the compiled kernel.
 
     Returns:
-        The estimated the spreading time for the asynchronous gossip.
+        The estimated the spreading time for the asynchronous gossip, or -1 if the spreading dies out before end_count
+            nodes are infected.
     """
-    t = 0
-    infected_node_set = set()
-    infected_node_set.add(source_node)
-    event_heap = []
-    heapq.heapify(event_heap)
-    PushAsynchronousEvent(event_heap, t + PoissonSample(1.0), source_node)
-    while True:
-        current_time, active_node = heapq.heappop(event_heap)
-        if set(neighbor_list[active_node]).issubset(infected_node_set):
+    # The kernel is compiled for contiguous int32 CSR arrays and integer counts only, so other networks
+    # (e.g. int64 arrays from scipy) are converted here, which is free for the networks built above.
+    indptr, indices = network
+    indptr = np.ascontiguousarray(indptr, np.int32)
+    indices = np.ascontiguousarray(indices, np.int32)
+    if end_count is None:
+        end_count = end_criteria * number_of_nodes
+    end_count = math.ceil(end_count)
+    if rng is None:
+        rng = _rng
+    return FastAsynchronousGossipKernel(indptr, indices, int(source_node), float(failure_probability), end_count, rng)
+
+@njit(types.float64(*FAST_GOSSIP_KERNEL_ARGUMENT_TYPES), cache=True)
+def FastAsynchronousGossipKernel(indptr, indices, source_node, failure_probability, end_count, rng):
+    """Runs the asynchronous gossip with unuseful event filtering as a compiled kernel.
+
+    The event heap is stored as parallel times and nodes arrays that start small and double when full.
+    The times are kept in float32, which halves the memory traffic of the sift operations, and is accurate
+    enough for the ordering of the events and for the spreading time averaged over many runs.
+    Every infected node owns at most one pending event, so the heap never needs more than number_of_nodes
+    entries. Events of nodes whose counter of uninfected neighbors reached zero are dropped.
+    Args:
+        indptr: The CSR row pointers of the network.
+        indices: The CSR neighbor indices of the network.
+        source_node: The source of the spreading process.
+        failure_probability: The probability that an infected node fails to push the information to its chosen.
+        end_count: The number of infected nodes that marks the end of the spreading process.
+        rng: The numpy random generator that the kernel draws from.
+
+    Returns:
+        The time until at least end_count nodes are infected, or -1 if no event is left before.
+    """
+    number_of_nodes = indptr.shape[0] - 1
+    infected = np.zeros(number_of_nodes, np.uint8)
+    uninfected_neighbor_counts = indptr[1:] - indptr[:-1]
+    times = np.empty(min(number_of_nodes, INITIAL_HEAP_CAPACITY), np.float32)
+    nodes = np.empty(min(number_of_nodes, INITIAL_HEAP_CAPACITY), np.int32)
+    InfectNode(indptr, indices, infected, uninfected_neighbor_counts, source_node)
+    infected_count = 1
+    size = HeapPush(times, nodes, 0, np.float32(rng.standard_exponential()), source_node)
+    while size > 0:
+        current_time, active_node, size = HeapPop(times, nodes, size)
+        if uninfected_neighbor_counts[active_node] == 0:
             continue
         uninf_node_chosen = False
-        if np.random.rand() >= failure_probability:
-            chosen_node = np.random.choice(neighbor_list[active_node])
-            uninf_node_chosen = (chosen_node not in infected_node_set)
-            infected_node_set.add(chosen_node)
-        if len(infected_node_set) >= end_criteria * number_of_nodes:
+        if rng.random() >= failure_probability:
+            start = indptr[active_node]
+            chosen_node = indices[start + rng.integers(0, indptr[active_node + 1] - start)]
+            if infected[chosen_node] == 0:
+                uninf_node_chosen = True
+                InfectNode(indptr, indices, infected, uninfected_neighbor_counts, chosen_node)
+                infected_count += 1
+        if infected_count >= end_count:
             return current_time
-        PushAsynchronousEvent(event_heap, current_time + PoissonSample(1.0), active_node)
+        size = HeapPush(times, nodes, size, np.float32(current_time + rng.standard_exponential()), active_node)
         if uninf_node_chosen:
-            PushAsynchronousEvent(event_heap, current_time + PoissonSample(1.0), chosen_node)
+            if size == times.shape[0]:
+                times, nodes = GrowHeap(times, nodes, number_of_nodes)
+            size = HeapPush(times, nodes, size, np.float32(current_time + rng.standard_exponential()), chosen_node)
+    return -1.0
+
+def InitializeGossipWorker(estimator, network_descriptions, number_of_nodes, end_counts):
+    """Sets up a pool worker once by attaching all shared networks, so that the tasks only carry their parameters.
+
+    Args:
+        estimator: The estimator that the worker runs, like FastEstimateAsynchronousGossipTime.
+        network_descriptions: The descriptions of the shared networks returned by CreateSharedNetwork.
+        number_of_nodes: Number of nodes in every network.
+        end_counts: The number of infected nodes that marks the end of the spreading process for every network.
+    """
+    global _worker_estimator, _worker_shared_memories, _worker_networks, _worker_number_of_nodes, _worker_end_counts
+    _worker_estimator = estimator
+    _worker_shared_memories = []
+    _worker_networks = []
+    for network_description in network_descriptions:
+        shared_memories, network = AttachSharedNetwork(network_description)
+        _worker_shared_memories.extend(shared_memories)
+        _worker_networks.append(network)
+    _worker_number_of_nodes = number_of_nodes
+    _worker_end_counts = end_counts
+
+def RunGossipTask(task):
+    """Runs one Monte Carlo simulation in a pool worker set up by InitializeGossipWorker.
+
+    Args:
+        task: The (network_index, failure_probability, source_node, seed) of the simulation, the seed is a
+            SeedSequence child that seeds the generator of this simulation only, so the result does not depend
+            on how the tasks are scheduled over the workers.
+
+    Returns:
+        The estimated spreading time.
+    """
+    network_index, failure_probability, source_node, seed = task
+    return _worker_estimator(source_node, _worker_number_of_nodes, _worker_networks[network_index], failure_probability,
+                             end_count=_worker_end_counts[network_index], rng=np.random.default_rng(seed))
+
+def RunGossipTasks(estimator, networks, number_of_nodes, end_counts, tasks, processes=None):
+    """Runs the Monte Carlo simulations of a whole sweep in a single process pool.
+
+    The networks are copied into shared memory once and every worker attaches all of them at startup.
+    The tasks are handed out in chunks of POOL_CHUNK_SIZE, so the slow tasks at the end of the sweep are still spread
+    over all workers.
+
+    Args:
+        estimator: The estimator that the workers run, like FastEstimateAsynchronousGossipTime.
+        networks: The (indptr, indices) CSR arrays of all networks of the sweep.
+        number_of_nodes: Number of nodes in every network.
+        end_counts: The number of infected nodes that marks the end of the spreading process for every network.
+        tasks: The (network_index, failure_probability, source_node, seed) of every simulation.
+        processes: Number of worker processes, all CPUs are used if it is None.
+
+    Returns:
+        The estimated spreading times in the order of the tasks.
+    """
+    shared_networks = [CreateSharedNetwork(network) for network in networks]
+    try:
+        network_descriptions = [network_description for _, network_description in shared_networks]
+        with Pool(processes=processes, initializer=InitializeGossipWorker,
+                  initargs=(estimator, network_descriptions, number_of_nodes, end_counts)) as pool:
+            return pool.map(RunGossipTask, tasks, chunksize=POOL_CHUNK_SIZE)
+    finally:
+        for shared_memories, _ in shared_networks:
+            for shared_memory in shared_memories:
+                shared_memory.close()
+                shared_memory.unlink()
 
 # Example of simulating the Gossip spreading process.
-number_of_nodes = 100000
-failure_probability = 0.0
-neighbor_list = ConstructGRNetwork(number_of_nodes, 10)
-source_node = int(number_of_nodes * np.random.rand())
-estimate_time = EstimateSynchronousGossipTime(source_node, number_of_nodes, neighbor_list, failure_probability)
-print(estimate_time)
+if __name__ == "__main__":
+    number_of_nodes = 100000
+    failure_probability = 0.0
+    network = ConstructGRNetwork(number_of_nodes, 10)
+    source_node = int(_rng.integers(number_of_nodes))
+    estimate_time = EstimateSynchronousGossipTime(source_node, number_of_nodes, network, failure_probability)
+    print(estimate_time)